@@ -0,0 +1,126 @@
+import asyncio
+import time
+from datetime import datetime
+
+from TimerWheel import TimerWheel
+from util import starprint
+
+
+#
+#
+#
+class ClientStatus:
+    """
+    Liveness information for one reporting client, identified by (charname, source host)
+    """
+
+    # ctor
+    def __init__(self, charname: str, host: str) -> None:
+        self.charname = charname
+        self.host = host
+        self.first_seen = datetime.now()
+        self.last_seen = self.first_seen
+        self.report_count = 0
+        self.alive = False
+
+
+#
+#
+#
+class ClientTracker:
+    """
+    Track which clients are actively feeding reports to the server.
+
+    Every report refreshes the client's last-seen time and re-arms its silence timer on a TimerWheel,
+    so each update is O(1) no matter how many clients are known.  A single coroutine ticks the wheel
+    once per second, and only the clients whose timers expire on that tick are touched
+    """
+
+    # ctor
+    def __init__(self, silence_seconds: int = 600, coverage_callback=None) -> None:
+        """
+        Args:
+            silence_seconds: seconds without a report before a client is considered silent
+            coverage_callback: optional coroutine function, called with the ClientStatus of the last live client when it goes silent
+        """
+        self.silence_seconds = silence_seconds
+        self.coverage_callback = coverage_callback
+
+        # dictionary of ClientStatus, keyed by (charname, host)
+        self._clients = {}
+        self.alive_count = 0
+
+        # one tick per second
+        self._wheel = TimerWheel()
+        self._start_time = None
+
+    def start(self) -> None:
+        """
+        kick off the coroutine which ticks the timer wheel
+        """
+        if self._start_time is None:
+            self._start_time = time.monotonic()
+            asyncio.create_task(self.run())
+
+    def update(self, charname: str, host: str) -> None:
+        """
+        Called on every report received from a client
+
+        Args:
+            charname: character name of the toon who sent the report
+            host: host name the report was sent from
+        """
+        key = (charname, host)
+        client_status = self._clients.get(key)
+        if client_status is None:
+            client_status = ClientStatus(charname, host)
+            self._clients[key] = client_status
+
+        client_status.last_seen = datetime.now()
+        client_status.report_count += 1
+        if not client_status.alive:
+            client_status.alive = True
+            self.alive_count += 1
+
+        self._wheel.schedule(key, self.silence_seconds)
+
+    def get_clients(self) -> list:
+        """
+        Returns:
+            list: all known ClientStatus objects, most recently seen first
+        """
+        return sorted(self._clients.values(), key=lambda c: c.last_seen, reverse=True)
+
+    async def run(self) -> None:
+        """
+        this method will execute in its own asyncio coroutine, and advances the wheel to keep pace with the clock
+        """
+        while True:
+            await asyncio.sleep(1.0)
+
+            # catch up on any ticks missed while the event loop was busy
+            elapsed = int(time.monotonic() - self._start_time)
+            while self._wheel.now < elapsed:
+                for key, payload in self._wheel.advance():
+                    await self._expire(key)
+
+    async def _expire(self, key: tuple) -> None:
+        """
+        called when a client's silence timer expires
+        """
+        client_status = self._clients[key]
+        client_status.alive = False
+        self.alive_count -= 1
+
+        # run the alert in its own task, so a slow or failing send can never stall or end the wheel ticking
+        if self.alive_count == 0 and self.coverage_callback:
+            asyncio.create_task(self._coverage_alert(client_status))
+
+    async def _coverage_alert(self, client_status: ClientStatus) -> None:
+        """
+        await the coverage callback, logging rather than raising any error from it
+        """
+        try:
+            await self.coverage_callback(client_status)
+        except Exception as err:
+            starprint(f'Client coverage alert failed: {err!r}')
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+# number of functions / allocation sites to include in each report
+TOPN = 40
+
+
+#
+#
+#
+class Diagnostics:
+    """
+    On-demand profiling and memory sampling of the running process.
+
+    Nothing here touches the parsing or dispatch code, and neither cProfile nor tracemalloc is active
+    until explicitly started, so there is no overhead at all while they are off.  Since everything runs in
+    the one asyncio event loop thread, a running profiler sees all of the parsing and dispatch work
+    """
+
+    # ctor
+    def __init__(self) -> None:
+        self._profiler = None
+        self._profile_start = 0.0
+
+        # incremented every time a profile is started, so a stale auto-stop can tell it is no longer needed
+        self.profile_session = 0
+
+        self._baseline = None
+
+    def is_profiling(self) -> bool:
+        """
+        Returns:
+            bool: True if the profiler is running
+        """
+        return self._profiler is not None
+
+    def profile_start(self) -> int:
+        """
+        Start the profiler
+
+        Returns:
+            int: session number for this profile
+        """
+        self.profile_session += 1
+        self._profiler = cProfile.Profile()
+        self._profile_start = time.monotonic()
+        self._profiler.enable()
+        return self.profile_session
+
+    def profile_stop(self) -> str:
+        """
+        Stop the profiler
+
+        Returns:
+            str: report of the TOPN functions by cumulative and by internal time
+        """
+        self._profiler.disable()
+        elapsed = time.monotonic() - self._profile_start
+
+        stream = io.StringIO()
+        stream.write(f'Profile of {elapsed:.1f} seconds\n\n')
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOPN)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(TOPN)
+
+        self._profiler = None
+        return stream.getvalue()
+
+    def is_tracing(self) -> bool:
+        """
+        Returns:
+            bool: True if tracemalloc is running
+        """
+        return tracemalloc.is_tracing()
+
+    def mem_start(self) -> None:
+        """
+        Start tracemalloc, and take the baseline snapshot that later snapshots are compared against
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+
+    def mem_snapshot(self) -> str:
+        """
+        Returns:
+            str: report of the TOPN allocation sites which have grown the most since the baseline
+        """
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        stream = io.StringIO()
+        stream.write(f'Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n')
+        stream.write(f'Top {TOPN} allocation sites, by growth since baseline:\n')
+        for stat in snapshot.compare_to(self._baseline, 'lineno')[:TOPN]:
+            stream.write(f'{stat}\n')
+
+        stream.write(f'\nTop {TOPN} allocation sites, by current size:\n')
+        for stat in snapshot.statistics('lineno')[:TOPN]:
+            stream.write(f'{stat}\n')
+
+        return stream.getvalue()
+
+    def mem_stop(self) -> None:
+        """
+        Stop tracemalloc and discard the baseline
+        """
+        tracemalloc.stop()
+        self._baseline = None
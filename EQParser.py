@@ -1,6 +1,7 @@
 
 
 import asyncio
+import io
 
 import socket
 import re
@@ -11,6 +12,12 @@ from discord.ext import commands
 import _version
 import config
 import LogFile
+from ClientTracker import ClientTracker, ClientStatus
+from Diagnostics import Diagnostics
+from MobTracker import MobTracker, parse_mob, SPAWN_PATTERN, FTE_PATTERN, TOD_PATTERN
+from RandomTracker import RandomTracker, RandomGroup, parse_random
+from WatchList import WatchList
+from WebhookSink import WebhookSink
 from util import starprint
 from util import SmartBuffer
 
@@ -64,6 +71,47 @@ class EQParser(LogFile.LogFile):
         # last GMOTD to avoid duplicates when swapping characters
         self.last_gmotd = ''
 
+        # aggregate /random rolls into one summary per (range, time window)
+        window_seconds = config.config_data.getint('Random Rolls', 'window_seconds')
+        top_n = config.config_data.getint('Random Rolls', 'top_n')
+        self.random_tracker = RandomTracker(self.random_report, window_seconds=window_seconds, top_n=top_n)
+
+        # track which clients are actively sending reports, with an optional alert when none are left
+        silence_seconds = config.config_data.getint('Client Liveness', 'silence_seconds')
+        coverage_callback = None
+        if config.config_data.getboolean('Client Liveness', 'coverage_alert'):
+            coverage_callback = self.coverage_report
+        self.client_tracker = ClientTracker(silence_seconds=silence_seconds, coverage_callback=coverage_callback)
+
+        # correlate the spawn, FTE, and ToD reports for each mob into one message, edited as they arrive
+        window_minutes = config.config_data.getint('Mob Lifecycle', 'window_minutes')
+        self.mob_tracker = MobTracker(window_minutes=window_minutes)
+
+        # channels which are delivered via webhooks rather than the bot, e.g. to fan out to servers the bot has not joined
+        self.webhooks = {}
+        routes = {
+            'personal_general': self.personal_general,
+            'personal_pop': self.personal_pop,
+            'personal_spawn': self.personal_spawn,
+            'personal_alert': self.personal_alert,
+            'personal_tod': self.personal_tod,
+            'personal_gmotd': self.personal_gmotd,
+            'personal_random': self.personal_random,
+            'personal_gratss': self.personal_gratss,
+            'snek_general': self.snek_general,
+            'snek_pop': self.snek_pop,
+        }
+        for route, urls in config.config_data.items('Webhooks'):
+            if route in routes:
+                self.webhooks[routes[route]] = urls.split()
+            else:
+                starprint(f'Unknown webhook route [{route}], expected one of {list(routes)}')
+
+        # user-defined triggers on the raw EQ text, managed via the !watch commands, and saved across restarts
+        self.watchlist_filename = config.config_data.get('Watches', 'file_name')
+        self.watchlist = WatchList()
+        self.watchlist.load(self.watchlist_filename)
+
     #
     # process each line
     async def process_line(self, line: str, printline: bool = False) -> None:
@@ -86,6 +134,15 @@ class EQParser(LogFile.LogFile):
         if m:
             # print(line, end='')
             charname = m.group('charname')
+
+            # the rsyslog prefix carries the host name the report was sent from, e.g.
+            # Oct  4 00:21:03 ip72-195-201-90.ph.ph.cox.net EQ__|...
+            source_host = 'Unknown'
+            host_match = re.match(r'^\w{3}\s+\d+\s+\d\d:\d\d:\d\d\s+(?P<source_host>\S+)\s', line)
+            if host_match:
+                source_host = host_match.group('source_host')
+            self.client_tracker.update(charname, source_host)
+
             log_event_id = int(m.group('log_event_id'))
             short_desc = m.group('short_desc')
             eq_log_line = m.group('eq_log_line')
@@ -98,39 +155,218 @@ class EQParser(LogFile.LogFile):
 
             # dispatch the parsed log events to the appropriate channels
             if log_event_id == LOGEVENT_VD or log_event_id == LOGEVENT_VT:
-                await client.channel_report(self.personal_spawn, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
-                await client.channel_report(self.personal_pop, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone=True)
-                await client.channel_report(self.snek_pop, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone=True)
+                # only the first report of each spawn raises the pop alerts
+                if await self.mob_spawn(charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line):
+                    await asyncio.gather(
+                        self.report(self.personal_pop, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone=True),
+                        self.report(self.snek_pop, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone=True))
 
             elif log_event_id == LOGEVENT_YAEL or log_event_id == LOGEVENT_DAIN or log_event_id == LOGEVENT_SEV or log_event_id == LOGEVENT_CT:
-                await client.channel_report(self.personal_spawn, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                await self.mob_spawn(charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+
+            elif log_event_id == LOGEVENT_FTE:
+                mob = parse_mob(short_desc, FTE_PATTERN)
+                if not mob or not await self.mob_update(self.mob_tracker.fte(mob, charname, utc_timestamp_datetime, eq_log_line)):
+                    await self.report(self.personal_alert, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
-            elif log_event_id == LOGEVENT_FTE or log_event_id == LOGEVENT_QUAKE:
-                await client.channel_report(self.personal_alert, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+            elif log_event_id == LOGEVENT_QUAKE:
+                await self.report(self.personal_alert, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
             elif log_event_id == LOGEVENT_RANDOM:
-                # await client.channel_report(self.personal_random, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
-                pass
+                # posting every roll floods the channel, so rolls are aggregated and summarized when their window closes
+                roll = parse_random(short_desc)
+                if roll:
+                    roller, low, high, value = roll
+                    self.random_tracker.add(roller, low, high, value, utc_timestamp_datetime)
 
             elif log_event_id == LOGEVENT_GRATSS:
-                await client.channel_report(self.personal_gratss, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                await self.report(self.personal_gratss, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
             elif log_event_id == LOGEVENT_TODLO or log_event_id == LOGEVENT_TODHI:
-                await client.channel_report(self.personal_tod, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                # slain messages carry the mob name, ToD called out in guild chat is matched against the mobs being tracked
+                mob = parse_mob(short_desc, TOD_PATTERN) if log_event_id == LOGEVENT_TODLO else None
+                if not await self.mob_update(self.mob_tracker.tod(mob, charname, utc_timestamp_datetime, eq_log_line)):
+                    await self.report(self.personal_tod, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
             elif log_event_id == LOGEVENT_GMOTD:
                 trunc_line = eq_log_line[27:]
                 if trunc_line != self.last_gmotd:
                     self.last_gmotd = trunc_line
-                    await client.channel_report(self.personal_gmotd, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                    await self.report(self.personal_gmotd, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
             elif log_event_id == LOGEVENT_PING:
                 short_desc = f'Latency = {round(client.latency * 1000)} ms'
-                await client.channel_report(self.personal_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
-                await client.channel_report(self.snek_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                await self.report(self.personal_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                await self.report(self.snek_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
 
             else:
-                await client.channel_report(self.personal_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+                await self.report(self.personal_general, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+
+            # check the raw EQ text against all the user-defined watches, and never let a bad watch stop the parsing
+            try:
+                watches = self.watchlist.match(eq_log_line)
+            except Exception as err:
+                starprint(f'Watch matching error: {err!r}')
+                watches = []
+            for watch in watches:
+                # a closed DM or a channel the bot can't post in only loses that one alert
+                watch_desc = f'Watch [{watch.watch_id}] [{watch.pattern}]: {short_desc}'
+                try:
+                    if watch.is_dm:
+                        await client.dm_report(watch.destination_id, charname, log_event_id, watch_desc, utc_timestamp_datetime, eq_log_line)
+                    else:
+                        await self.report(watch.destination_id, charname, log_event_id, watch_desc, utc_timestamp_datetime, eq_log_line)
+                except discord.HTTPException as err:
+                    starprint(f'Unable to deliver watch [{watch.watch_id}] to [{watch.owner}]: {err}')
+
+    #
+    # open or update the lifecycle for a spawn report
+    async def mob_spawn(self, charname: str,
+                        log_event_id: int,
+                        short_desc: str,
+                        utc_timestamp_datetime: datetime,
+                        eq_log_line: str) -> bool:
+        """
+        Post the lifecycle message for the first spawn report of each mob, later reports of the same spawn are absorbed
+
+        Args:
+            charname: character name of the toon who sent the report
+            log_event_id: log event type number
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+
+        Returns:
+            bool: True if this is the first report of this spawn
+        """
+        mob = parse_mob(short_desc, SPAWN_PATTERN)
+        if not mob:
+            await self.report(self.personal_spawn, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+            return True
+
+        lifecycle, is_new = self.mob_tracker.spawn(mob, charname, utc_timestamp_datetime, eq_log_line)
+        if is_new:
+            # sent via the bot rather than any webhook route, since the message handle is needed for later edits
+            channel = client.get_channel(self.personal_spawn)
+            if channel:
+                try:
+                    lifecycle.message = await channel.send(lifecycle.format(client.suffix))
+                except discord.HTTPException as err:
+                    starprint(f'Unable to post lifecycle message for [{lifecycle.mob}]: {err}')
+
+            # no message to edit, so this and the rest of the lifecycle are reported the ordinary way
+            if lifecycle.message is None:
+                await self.report(self.personal_spawn, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+        return is_new
+
+    #
+    # edit the lifecycle message in place
+    async def mob_update(self, update: tuple) -> bool:
+        """
+        Edit the lifecycle message if the lifecycle changed state
+
+        Args:
+            update: (MobLifecycle or None, bool) tuple, as returned from MobTracker.fte() or MobTracker.tod()
+
+        Returns:
+            bool: True if the report was correlated with a lifecycle, False if it needs to be reported on its own
+        """
+        lifecycle, changed = update
+        if lifecycle is None or lifecycle.message is None:
+            return False
+
+        if changed:
+            try:
+                await lifecycle.message.edit(content=lifecycle.format(client.suffix))
+            except discord.HTTPException as err:
+                starprint(f'Unable to edit lifecycle message for [{lifecycle.mob}]: {err}')
+        return True
+
+    #
+    # send the report via the route configured for this channel
+    async def report(self, channel_id: int,
+                     charname: str,
+                     log_event_id: int,
+                     short_desc: str,
+                     utc_timestamp_datetime: datetime,
+                     eq_log_line: str,
+                     everyone: bool = False) -> None:
+        """
+        Issue a report to the indicated channel, via its webhooks if any are configured, else via the bot
+
+        Args:
+            channel_id: discord channel ID
+            charname: character name of the toon who sent the report
+            log_event_id: log event type number
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+            everyone: boolean flag, if True, prepend the message with '@everyone'
+        """
+        webhook_urls = self.webhooks.get(channel_id)
+        if webhook_urls:
+            await client.webhook_report(webhook_urls, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone)
+        else:
+            await client.channel_report(channel_id, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone)
+
+    #
+    # send preformatted text via the route configured for this channel
+    async def send(self, channel_id: int, buff_list: list) -> None:
+        """
+        Send a list of messages to the indicated channel, via its webhooks if any are configured, else via the bot
+
+        Args:
+            channel_id: discord channel ID
+            buff_list: list of message strings, e.g. from SmartBuffer.get_bufflist()
+        """
+        webhook_urls = self.webhooks.get(channel_id)
+        if webhook_urls:
+            await client.webhook_sink.fan_out(webhook_urls, buff_list)
+        else:
+            channel = client.get_channel(channel_id)
+            if channel:
+                for b in buff_list:
+                    await channel.send(b)
+
+    #
+    # report the summary of one window of random rolls
+    async def random_report(self, group: RandomGroup) -> None:
+        """
+        Called by the RandomTracker when a roll window closes
+
+        Args:
+            group: the closed group of rolls
+        """
+        # convert the UTC to EDT (4 hours behind UTC), then represent it in the same format of an EQ timestamp
+        edt_modifier = timedelta(hours=-4)
+        edt_timestamp_datetime = group.start_utc + edt_modifier
+        edt_eqtimestamp_str = edt_timestamp_datetime.strftime('[%a %b %d %H:%M:%S %Y]')
+
+        # accumulate all discord output into a SmartBuffer
+        sb = SmartBuffer()
+        sb.add(f'Random {group.low}-{group.high}: {group.count} roll(s) {client.suffix}\n')
+
+        line = '```'
+        for rank, (roller, value) in enumerate(group.get_leaders(), start=1):
+            line += f'{rank}. {roller:<20}{value:>8}\n'
+        line += f'EDT: {edt_eqtimestamp_str}'
+        line += '```'
+        sb.add(line)
+
+        # send info from SmartBuffer to discord
+        await self.send(self.personal_random, sb.get_bufflist())
+
+    #
+    # alert that no clients are reporting
+    async def coverage_report(self, client_status: ClientStatus) -> None:
+        """
+        Called by the ClientTracker when the last live client goes silent
+
+        Args:
+            client_status: the last client to go silent
+        """
+        await self.send(self.personal_alert, [f'No clients reporting, last was {client_status.charname} ({client_status.host}), '
+                                              f'silent since {client_status.last_seen:%a %b %d %H:%M:%S} {client.suffix}'])
 
 
 # create the global instance of the parser class
@@ -164,6 +400,18 @@ class DiscordClient(commands.Bot):
         else:
             self.suffix = '[v]'
 
+        # alternative delivery path, posting to webhooks over a pooled HTTP session rather than through the bot
+        self.webhook_sink = WebhookSink()
+
+        # on-demand profiling and memory sampling, controlled via the !profile and !mem commands
+        self.diagnostics = Diagnostics()
+
+    #
+    # shut down the webhook connection pool along with the bot
+    async def close(self) -> None:
+        await self.webhook_sink.close()
+        await super().close()
+
     #
     # send output to indicated channel number
     async def channel_report(self, channel_id: int,
@@ -190,36 +438,132 @@ class DiscordClient(commands.Bot):
             everyone: boolean flag, if True, prepend the message with '@everyone'
         """
         channel = client.get_channel(channel_id)
+        await self.report(channel, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line, everyone)
+
+    #
+    # send output to indicated user as a direct message
+    async def dm_report(self, user_id: int,
+                        charname: str,
+                        log_event_id: int,
+                        short_desc: str,
+                        utc_timestamp_datetime: datetime,
+                        eq_log_line: str) -> None:
+        """
+        Issue a report to the indicated user, as a direct message
+
+        Args:
+            user_id: discord user ID
+            charname: character name of the toon who sent the report
+            log_event_id: log event type number
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+        """
+        # without the members intent, the user is often not in the cache, e.g. for watches reloaded after a restart
+        user = client.get_user(user_id)
+        if user is None:
+            try:
+                user = await client.fetch_user(user_id)
+            except discord.HTTPException as err:
+                starprint(f'Unable to find user [{user_id}] for direct message: {err}')
+                return
+        await self.report(user, charname, log_event_id, short_desc, utc_timestamp_datetime, eq_log_line)
+
+    #
+    # format the report and send it to the destination
+    async def report(self, channel: discord.abc.Messageable or None,
+                     charname: str,
+                     log_event_id: int,
+                     short_desc: str,
+                     utc_timestamp_datetime: datetime,
+                     eq_log_line: str,
+                     everyone: bool = False) -> None:
+        """
+        Format a report and send it to the indicated destination
+
+        Args:
+            channel: discord channel or user to receive the report, or None if it could not be found
+            charname: character name of the toon who sent the report
+            log_event_id: log event type number
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+            everyone: boolean flag, if True, prepend the message with '@everyone'
+        """
         if channel:
+            buff_list = self.format_report(charname, short_desc, utc_timestamp_datetime, eq_log_line, everyone)
+            for b in buff_list:
+                await channel.send(b)
 
-            # accumulate all discord output into a SmartBuffer
-            sb = SmartBuffer()
+    #
+    # send output to a list of webhooks
+    async def webhook_report(self, webhook_urls: list,
+                             charname: str,
+                             log_event_id: int,
+                             short_desc: str,
+                             utc_timestamp_datetime: datetime,
+                             eq_log_line: str,
+                             everyone: bool = False) -> None:
+        """
+        Issue a report to each of the indicated webhooks, in parallel, bypassing the bot connection
 
-            if everyone:
-                short_desc = '@everyone' + short_desc
+        Args:
+            webhook_urls: list of discord webhook URLs
+            charname: character name of the toon who sent the report
+            log_event_id: log event type number
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+            everyone: boolean flag, if True, prepend the message with '@everyone'
+        """
+        buff_list = self.format_report(charname, short_desc, utc_timestamp_datetime, eq_log_line, everyone)
+        await self.webhook_sink.fan_out(webhook_urls, buff_list)
 
-            # send the first line of the report
-            # await channel.send(f'{short_desc} (from: {charname})')
-            sb.add(f'{short_desc} (from: {charname}) {client.suffix}')
+    #
+    # format the report text
+    def format_report(self, charname: str,
+                      short_desc: str,
+                      utc_timestamp_datetime: datetime,
+                      eq_log_line: str,
+                      everyone: bool = False) -> list:
+        """
+        Format a report into a list of strings, each short enough to send to discord
 
-            # convert the UTC to EDT (4 hours behind UTC), then represent it in the same format of an EQ timestamp
-            edt_modifier = timedelta(hours=-4)
-            edt_timestamp_datetime = utc_timestamp_datetime + edt_modifier
-            edt_eqtimestamp_str = edt_timestamp_datetime.strftime('[%a %b %d %H:%M:%S %Y]')
+        Args:
+            charname: character name of the toon who sent the report
+            short_desc: short description
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+            everyone: boolean flag, if True, prepend the message with '@everyone'
 
-            # send the second and third line of the report
-            line = '```'
-            line += f'Raw: {eq_log_line}'
-            line += '\n'
-            line += f'EDT: {edt_eqtimestamp_str}'
-            line += '```'
-            # await channel.send(line)
-            sb.add(line)
+        Returns:
+            list: list of message strings
+        """
+        # accumulate all discord output into a SmartBuffer
+        sb = SmartBuffer()
 
-            # send info from SmartBuffer to discord
-            buff_list = sb.get_bufflist()
-            for b in buff_list:
-                await channel.send(b)
+        if everyone:
+            short_desc = '@everyone' + short_desc
+
+        # send the first line of the report
+        # await channel.send(f'{short_desc} (from: {charname})')
+        sb.add(f'{short_desc} (from: {charname}) {self.suffix}')
+
+        # convert the UTC to EDT (4 hours behind UTC), then represent it in the same format of an EQ timestamp
+        edt_modifier = timedelta(hours=-4)
+        edt_timestamp_datetime = utc_timestamp_datetime + edt_modifier
+        edt_eqtimestamp_str = edt_timestamp_datetime.strftime('[%a %b %d %H:%M:%S %Y]')
+
+        # send the second and third line of the report
+        line = '```'
+        line += f'Raw: {eq_log_line}'
+        line += '\n'
+        line += f'EDT: {edt_eqtimestamp_str}'
+        line += '```'
+        # await channel.send(line)
+        sb.add(line)
+
+        return sb.get_bufflist()
 
 
 # create the global instance of the client that manages communication to the discord bot
@@ -241,6 +585,7 @@ async def on_ready():
     starprint(f'Logged on as {client.user}')
     starprint(f'App ID: {client.user.id}')
     the_parser.go()
+    the_parser.client_tracker.start()
 
 
 # on_message - catches everything, messages and commands
@@ -285,6 +630,208 @@ async def firedrill(ctx):
     await channel.send(f'This is a test.  This is only a test. {client.suffix}')
 
 
+# profile command
+# admin only, run cProfile over everything the bot does, including parsing and dispatch, for a bounded window
+#       !profile start [seconds]
+#       !profile stop
+@client.command()
+@commands.has_permissions(administrator=True)
+async def profile(ctx, action: str = 'start', seconds: int = 60):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    diagnostics = client.diagnostics
+    if action == 'start':
+        if diagnostics.is_profiling():
+            await ctx.send(f'Profiler already running {client.suffix}')
+            return
+
+        # cap the window, since the profiler slows everything down while it is running
+        seconds = max(1, min(seconds, 600))
+        session = diagnostics.profile_start()
+        await ctx.send(f'Profiler started for {seconds} seconds {client.suffix}')
+
+        # stop automatically at the end of the window, unless it was stopped (and maybe restarted) already
+        await asyncio.sleep(seconds)
+        if diagnostics.is_profiling() and diagnostics.profile_session == session:
+            await send_profile(ctx)
+
+    elif action == 'stop':
+        if diagnostics.is_profiling():
+            await send_profile(ctx)
+        else:
+            await ctx.send(f'Profiler not running {client.suffix}')
+
+    else:
+        await ctx.send(f'Usage: {client.command_prefix}profile (start [seconds]|stop) {client.suffix}')
+
+
+# stop the profiler and send the results as a file
+async def send_profile(ctx):
+    report = client.diagnostics.profile_stop()
+    report_file = discord.File(io.BytesIO(report.encode()), filename='profile.txt')
+    await ctx.send(f'Profiler stopped {client.suffix}', file=report_file)
+
+
+# mem command
+# admin only, tracemalloc snapshots diffed against a baseline
+#       !mem start      start tracing and take the baseline
+#       !mem            snapshot, and send the top allocation sites vs the baseline
+#       !mem stop       stop tracing
+@client.command()
+@commands.has_permissions(administrator=True)
+async def mem(ctx, action: str = 'snapshot'):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    diagnostics = client.diagnostics
+    if action == 'start':
+        diagnostics.mem_start()
+        await ctx.send(f'Memory tracing started, baseline taken {client.suffix}')
+
+    elif action == 'stop':
+        if diagnostics.is_tracing():
+            diagnostics.mem_stop()
+        await ctx.send(f'Memory tracing stopped {client.suffix}')
+
+    elif action == 'snapshot':
+        if not diagnostics.is_tracing():
+            await ctx.send(f'Memory tracing not running, use {client.command_prefix}mem start {client.suffix}')
+            return
+        report = diagnostics.mem_snapshot()
+        report_file = discord.File(io.BytesIO(report.encode()), filename='mem.txt')
+        await ctx.send(f'Memory snapshot {client.suffix}', file=report_file)
+
+    else:
+        await ctx.send(f'Usage: {client.command_prefix}mem [start|stop] {client.suffix}')
+
+
+# error handler for the admin only diagnostics commands
+# tell the user why nothing happened, rather than failing silently with a traceback on the console
+@profile.error
+@mem.error
+async def diagnostics_error(ctx, error):
+    if isinstance(error, commands.CheckFailure):
+        await ctx.send(f'{client.command_prefix}{ctx.command.name} is admin only, and only from within the server {client.suffix}')
+    else:
+        starprint(f'Command error: [{ctx.message.content}] from [{ctx.message.author}]: {error!r}')
+        await ctx.send(f'{client.command_prefix}{ctx.command.name} failed: {error} {client.suffix}')
+
+
+# clients command
+# list the clients which have been sending reports, and how recently
+@client.command()
+async def clients(ctx):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    tracker = the_parser.client_tracker
+    now = datetime.now()
+
+    sb = SmartBuffer()
+    sb.add(f'{tracker.alive_count} of {len(tracker.get_clients())} client(s) reporting {client.suffix}\n')
+    for c in tracker.get_clients():
+        seconds = int((now - c.last_seen).total_seconds())
+        state = 'live' if c.alive else 'SILENT'
+        sb.add(f'`{state:<7}{c.charname:<16}{c.host:<40}{seconds:>8}s ago{c.report_count:>8} reports`\n')
+
+    for b in sb.get_bufflist():
+        await ctx.send(b)
+
+
+# watch command group
+# user-defined triggers on the raw EQ text, e.g.
+#       !watch add here Crown of Narandi
+#       !watch add dm /vessel\s+drozlin/
+#       !watch add #gratss /\d+\s+gratss/
+@client.group(invoke_without_command=True)
+async def watch(ctx):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+    await ctx.send(f'Usage: {client.command_prefix}watch add (here|dm|#channel) (keyword|/regex/), '
+                   f'{client.command_prefix}watch remove id, {client.command_prefix}watch list {client.suffix}')
+
+
+# add a watch
+@watch.command(name='add')
+async def watch_add(ctx, destination: str, *, pattern: str):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    # where should matches be sent
+    is_dm = False
+    target = None
+    if destination.lower() == 'dm':
+        is_dm = True
+        destination_id = ctx.author.id
+    elif destination.lower() == 'here':
+        target = ctx.channel
+    else:
+        # the destination itself must be the mention, a #channel later in the pattern is just part of the pattern
+        target = discord.utils.get(ctx.message.channel_mentions, mention=destination)
+    if not is_dm and target is None:
+        await ctx.send(f'Unknown destination [{destination}], use here, dm, or a #channel {client.suffix}')
+        return
+
+    # only those who can manage messages in a channel may send watch alerts to it
+    if target:
+        if ctx.guild is None:
+            await ctx.send(f'Channel watches must be added from within the server, use dm here {client.suffix}')
+            return
+        member = target.guild.get_member(ctx.author.id)
+        if member is None or not target.permissions_for(member).manage_messages:
+            await ctx.send(f'You need Manage Messages permission in {target.mention} to send watches there {client.suffix}')
+            return
+        destination_id = target.id
+
+    # patterns wrapped in slashes are regular expressions, anything else is a plain keyword
+    is_regex = False
+    if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+        is_regex = True
+        pattern = pattern[1:-1]
+
+    try:
+        new_watch = the_parser.watchlist.add(pattern, is_regex, destination_id, is_dm, str(ctx.author), ctx.author.id)
+        the_parser.watchlist.save(the_parser.watchlist_filename)
+        await ctx.send(f'Added watch {new_watch} {client.suffix}')
+    except re.error as err:
+        await ctx.send(f'Invalid regex [{pattern}]: {err} {client.suffix}')
+
+
+# remove a watch
+# only the owner, or someone who can manage messages in the current channel, may remove it
+@watch.command(name='remove', aliases=['rm', 'del'])
+async def watch_remove(ctx, watch_id: int):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    old_watch = None
+    for w in the_parser.watchlist.get_watches():
+        if w.watch_id == watch_id:
+            old_watch = w
+
+    if old_watch is None:
+        await ctx.send(f'No watch with ID [{watch_id}] {client.suffix}')
+        return
+
+    is_moderator = ctx.guild is not None and ctx.channel.permissions_for(ctx.author).manage_messages
+    if old_watch.owner_id != ctx.author.id and not is_moderator:
+        await ctx.send(f'Only the owner ({old_watch.owner}) or a moderator can remove watch [{watch_id}] {client.suffix}')
+        return
+
+    the_parser.watchlist.remove(watch_id)
+    the_parser.watchlist.save(the_parser.watchlist_filename)
+    await ctx.send(f'Removed watch {old_watch} {client.suffix}')
+
+
+# list all watches
+@watch.command(name='list', aliases=['ls'])
+async def watch_list(ctx):
+    starprint(f'Command received: [{ctx.message.content}] from [{ctx.message.author}]')
+
+    sb = SmartBuffer()
+    sb.add(f'Active watches: {client.suffix}\n')
+    for w in the_parser.watchlist.get_watches():
+        sb.add(f'{w}\n')
+
+    for b in sb.get_bufflist():
+        await ctx.send(b)
+
+
 #################################################################################################
 
 
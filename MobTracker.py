@@ -0,0 +1,236 @@
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+# lifecycle states
+MOB_SPAWNED = 'Spawned'
+MOB_ENGAGED = 'Engaged'
+MOB_SLAIN = 'Slain'
+
+# patterns to pull the mob name out of the short descriptions sent by the clients
+SPAWN_PATTERN = r'^(?P<mob>.+?) spawn!'
+FTE_PATTERN = r'^FTE: (?P<mob>.+?) engages '
+TOD_PATTERN = r'^TOD \(Slain Message\): (?P<mob>.+)$'
+
+# longest raw line to show for each step, to keep the whole message well under the discord limit
+MAXRAWLENGTH = 300
+
+
+#
+#
+#
+class MobLifecycle:
+    """
+    Everything seen so far for one mob, from its first spawn report through FTE to time of death
+    """
+
+    # ctor
+    def __init__(self, mob: str, charname: str, utc_timestamp_datetime: datetime, eq_log_line: str) -> None:
+        """
+        Args:
+            mob: mob name
+            charname: character name of the toon who sent the first spawn report
+            utc_timestamp_datetime: UTC timestamp of the first spawn report
+            eq_log_line: raw line of text of the first spawn report
+        """
+        self.mob = mob
+        self.state = MOB_SPAWNED
+        self.last_utc = utc_timestamp_datetime
+
+        # server monotonic time of the last report, used only to sweep out stale lifecycles
+        self.last_seen = time.monotonic()
+
+        # (charname, UTC timestamp, raw line) for each step, filled in as they arrive
+        self.spawn = (charname, utc_timestamp_datetime, eq_log_line)
+        self.fte = None
+        self.tod = None
+
+        # handle for the discord message showing this lifecycle, so it can be edited in place
+        self.message = None
+
+    def format(self, suffix: str) -> str:
+        """
+        Args:
+            suffix: signature suffix indicating which server is sending the message
+
+        Returns:
+            str: message text showing the current state of this lifecycle
+        """
+        rv = f'{self.mob}: {self.state} {suffix}\n'
+        rv += '```'
+        for label, step in [('Spawn', self.spawn), ('FTE', self.fte), ('ToD', self.tod)]:
+            if step:
+                charname, utc_timestamp_datetime, eq_log_line = step
+
+                # convert the UTC to EDT (4 hours behind UTC), then represent it in the same format of an EQ timestamp
+                edt_timestamp_datetime = utc_timestamp_datetime + timedelta(hours=-4)
+                edt_eqtimestamp_str = edt_timestamp_datetime.strftime('[%a %b %d %H:%M:%S %Y]')
+                rv += f'{label + ":":<7}EDT: {edt_eqtimestamp_str} (from: {charname})\n'
+                rv += f'       Raw: {eq_log_line[:MAXRAWLENGTH]}\n'
+        rv += '```'
+        return rv
+
+
+#
+#
+#
+class MobTracker:
+    """
+    Correlate the spawn, FTE, and time of death reports for each mob into a single lifecycle.
+
+    Lifecycles are opened by spawn reports, and are keyed by mob name in a dictionary kept in order
+    of last update, so lookups, updates, and expiring stale lifecycles from the front are all O(1).
+    Reports for a mob timestamped more than window_minutes after that mob's previous report belong to
+    a new lifecycle, and lifecycles with no reports for window_minutes of server time are dropped
+    """
+
+    # ctor
+    def __init__(self, window_minutes: int = 30) -> None:
+        """
+        Args:
+            window_minutes: longest gap between reports for the same lifecycle
+        """
+        self.window = timedelta(minutes=window_minutes)
+
+        # dictionary of MobLifecycle, keyed by lower case mob name, in order of last update
+        self._lifecycles = OrderedDict()
+
+    def spawn(self, mob: str, charname: str, utc_timestamp_datetime: datetime, eq_log_line: str) -> tuple:
+        """
+        Record a spawn report
+
+        Args:
+            mob: mob name
+            charname: character name of the toon who sent the report
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+
+        Returns:
+            tuple: (MobLifecycle, bool), where the bool is True if this report opened a new lifecycle
+        """
+        lifecycle = self._get(mob, utc_timestamp_datetime)
+        is_new = lifecycle is None
+        if is_new:
+            lifecycle = MobLifecycle(mob, charname, utc_timestamp_datetime, eq_log_line)
+            self._lifecycles[mob.lower()] = lifecycle
+
+        self._touch(lifecycle, utc_timestamp_datetime)
+        return lifecycle, is_new
+
+    def fte(self, mob: str, charname: str, utc_timestamp_datetime: datetime, eq_log_line: str) -> tuple:
+        """
+        Record a first-to-engage report
+
+        Args:
+            mob: mob name
+            charname: character name of the toon who sent the report
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+
+        Returns:
+            tuple: (MobLifecycle or None, bool), where the lifecycle is None if this mob has no open lifecycle,
+            and the bool is True if the lifecycle changed state
+        """
+        lifecycle = self._get(mob, utc_timestamp_datetime)
+        if lifecycle is None:
+            return None, False
+
+        changed = False
+        if lifecycle.state == MOB_SPAWNED:
+            lifecycle.state = MOB_ENGAGED
+            lifecycle.fte = (charname, utc_timestamp_datetime, eq_log_line)
+            changed = True
+
+        self._touch(lifecycle, utc_timestamp_datetime)
+        return lifecycle, changed
+
+    def tod(self, mob: str or None, charname: str, utc_timestamp_datetime: datetime, eq_log_line: str) -> tuple:
+        """
+        Record a time of death report
+
+        Args:
+            mob: mob name, or None if the mob name is not known and is to be searched for in eq_log_line,
+                e.g. for a ToD called out in guild chat
+            charname: character name of the toon who sent the report
+            utc_timestamp_datetime: UTC timestamp
+            eq_log_line: raw line of text
+
+        Returns:
+            tuple: (MobLifecycle or None, bool), where the lifecycle is None if this mob has no open lifecycle,
+            and the bool is True if the lifecycle changed state
+        """
+        if mob is None:
+            mob = self._find_mob(eq_log_line)
+            if mob is None:
+                return None, False
+
+        lifecycle = self._get(mob, utc_timestamp_datetime)
+        if lifecycle is None:
+            return None, False
+
+        changed = False
+        if lifecycle.state != MOB_SLAIN:
+            lifecycle.state = MOB_SLAIN
+            lifecycle.tod = (charname, utc_timestamp_datetime, eq_log_line)
+            changed = True
+
+        self._touch(lifecycle, utc_timestamp_datetime)
+        return lifecycle, changed
+
+    def _get(self, mob: str, utc_timestamp_datetime: datetime) -> MobLifecycle or None:
+        """
+        expire any stale lifecycles, then return the open lifecycle for this mob, if there is one
+        """
+        # lifecycles are in order of last update, so the stale ones are all at the front.  this sweep runs on the
+        # server clock, since the client timestamps come from many clocks and can arrive out of order
+        now = time.monotonic()
+        while self._lifecycles:
+            oldest = next(iter(self._lifecycles.values()))
+            if now - oldest.last_seen <= self.window.total_seconds():
+                break
+            self._lifecycles.popitem(last=False)
+
+        # whether this report belongs to the open lifecycle depends only on that mob's own reports
+        lifecycle = self._lifecycles.get(mob.lower())
+        if lifecycle and utc_timestamp_datetime - lifecycle.last_utc > self.window:
+            del self._lifecycles[mob.lower()]
+            lifecycle = None
+        return lifecycle
+
+    def _touch(self, lifecycle: MobLifecycle, utc_timestamp_datetime: datetime) -> None:
+        """
+        move the lifecycle to the back of the expiry order
+        """
+        if utc_timestamp_datetime > lifecycle.last_utc:
+            lifecycle.last_utc = utc_timestamp_datetime
+        lifecycle.last_seen = time.monotonic()
+        self._lifecycles.move_to_end(lifecycle.mob.lower())
+
+    def _find_mob(self, eq_log_line: str) -> str or None:
+        """
+        find the name of any open lifecycle mentioned in a line of text
+        """
+        text = eq_log_line.lower()
+        for key, lifecycle in self._lifecycles.items():
+            if key in text:
+                return lifecycle.mob
+        return None
+
+
+def parse_mob(short_desc: str, pattern: str) -> str or None:
+    """
+    Pull the mob name out of a short description
+
+    Args:
+        short_desc: short description, e.g. 'Vessel Drozlin spawn!'
+        pattern: regular expression with a 'mob' named group
+
+    Returns:
+        str or None: mob name, or None if the short description did not match
+    """
+    m = re.match(pattern, short_desc)
+    if m:
+        return m.group('mob').strip()
+    return None
@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import re
+from datetime import datetime, timedelta
+
+from util import starprint
+
+
+#
+#
+#
+class RandomGroup:
+    """
+    All the /random rolls for one range (e.g. 0-1000) that arrive within one time window.
+
+    Only the top N rolls are kept, in a min-heap, so the lowest of the current leaders is always at
+    the front and can be displaced by a higher roll in O(log N)
+    """
+
+    # ctor
+    def __init__(self, low: int, high: int, start_utc: datetime, top_n: int) -> None:
+        """
+        Args:
+            low: low end of the roll range
+            high: high end of the roll range
+            start_utc: UTC timestamp of the first roll in this group
+            top_n: number of leading rolls to keep
+        """
+        self.low = low
+        self.high = high
+        self.start_utc = start_utc
+        self.top_n = top_n
+
+        # heap of (value, roller) tuples, lowest value at the front
+        self._heap = []
+
+        # (roller, value) pairs already counted, so the same roll reported by several clients is only counted once
+        self._seen = set()
+        self.count = 0
+
+    def add(self, roller: str, value: int) -> bool:
+        """
+        Args:
+            roller: name of the player who rolled
+            value: value rolled
+
+        Returns:
+            bool: True if this is a new roll, False if it is a duplicate report of a roll already seen
+        """
+        if self.is_duplicate(roller, value):
+            return False
+
+        self._seen.add((roller, value))
+        self.count += 1
+
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, (value, roller))
+        elif value > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (value, roller))
+
+        return True
+
+    def is_duplicate(self, roller: str, value: int) -> bool:
+        """
+        Args:
+            roller: name of the player who rolled
+            value: value rolled
+
+        Returns:
+            bool: True if this roll has already been counted in this group
+        """
+        return (roller, value) in self._seen
+
+    def get_leaders(self) -> list:
+        """
+        Returns:
+            list: (roller, value) tuples of the top N rolls, highest first
+        """
+        return [(roller, value) for (value, roller) in sorted(self._heap, reverse=True)]
+
+
+#
+#
+#
+class RandomTracker:
+    """
+    Aggregate the stream of /random rolls into one summary per (range, time window).
+
+    A roll joins the open group for its range if it falls within window_seconds of the first roll in
+    that group, allowing skew_seconds either side for clients whose clocks disagree, otherwise it opens
+    a new group.  Each group is closed window_seconds after it opens, plus a small grace period for late
+    reports, at which point the report callback is awaited with the group.  The most recently closed
+    group for each range is kept, so a late duplicate of one of its rolls does not open a new group
+    """
+
+    # ctor
+    def __init__(self, report_callback, window_seconds: int = 30, top_n: int = 5, grace_seconds: int = 5, skew_seconds: int = 5) -> None:
+        """
+        Args:
+            report_callback: coroutine function, called with the RandomGroup when each group closes
+            window_seconds: length of each roll window, in seconds
+            top_n: number of leading rolls to report for each group
+            grace_seconds: additional wait before closing a group, to allow for late reports
+            skew_seconds: allowance either side of the window, for differences between client clocks
+        """
+        self.report_callback = report_callback
+        self.window = timedelta(seconds=window_seconds)
+        self.top_n = top_n
+        self.grace_seconds = grace_seconds
+        self.skew = timedelta(seconds=skew_seconds)
+
+        # dictionary of open groups, keyed by (low, high), each holding a list of open groups for that range
+        self._groups = {}
+
+        # dictionary of the most recently closed group, keyed by (low, high)
+        self._closed = {}
+
+    def add(self, roller: str, low: int, high: int, value: int, utc_timestamp_datetime: datetime) -> bool:
+        """
+        Add one roll to the tracker
+
+        Args:
+            roller: name of the player who rolled
+            low: low end of the roll range
+            high: high end of the roll range
+            value: value rolled
+            utc_timestamp_datetime: UTC timestamp of the roll
+
+        Returns:
+            bool: True if this is a new roll, False if it is a duplicate report of a roll already seen
+        """
+        key = (low, high)
+        # find the open group whose window contains this roll
+        for group in self._groups.get(key, []):
+            if self._in_window(group, utc_timestamp_datetime):
+                return group.add(roller, value)
+
+        # a late duplicate of a roll that was already reported?
+        closed = self._closed.get(key)
+        if closed and self._in_window(closed, utc_timestamp_datetime) and closed.is_duplicate(roller, value):
+            return False
+
+        # none found, so open a new group and schedule it to close
+        group = RandomGroup(low, high, utc_timestamp_datetime, self.top_n)
+        self._groups.setdefault(key, []).append(group)
+        asyncio.create_task(self._close(key, group))
+        return group.add(roller, value)
+
+    async def _close(self, key: tuple, group: RandomGroup) -> None:
+        """
+        wait for the window to expire, then remove the group and report it
+        """
+        await asyncio.sleep(self.window.total_seconds() + self.grace_seconds)
+
+        group_list = self._groups[key]
+        group_list.remove(group)
+        if not group_list:
+            del self._groups[key]
+        self._closed[key] = group
+
+        # this runs in its own task, so an error here would otherwise go unnoticed until the task is garbage collected
+        try:
+            await self.report_callback(group)
+        except Exception as err:
+            starprint(f'Random roll report for {group.low}-{group.high} failed: {err!r}')
+
+    def _in_window(self, group: RandomGroup, utc_timestamp_datetime: datetime) -> bool:
+        """
+        True if the timestamp falls within the group's window, allowing for clock skew either side
+        """
+        return group.start_utc - self.skew <= utc_timestamp_datetime < group.start_utc + self.window + self.skew
+
+
+def parse_random(short_desc: str) -> tuple or None:
+    """
+    Parse the short description sent by the clients for a LOGEVENT_RANDOM report,
+    e.g. 'Random roll: Azleep, 0-1000, Value=687'
+
+    Args:
+        short_desc: short description
+
+    Returns:
+        tuple or None: (roller, low, high, value), or None if short_desc is not in the expected format
+    """
+    m = re.match(r'^Random roll: (?P<roller>\S+), (?P<low>\d+)-(?P<high>\d+), Value=(?P<value>\d+)', short_desc)
+    if m:
+        return m.group('roller'), int(m.group('low')), int(m.group('high')), int(m.group('value'))
+    return None
@@ -0,0 +1,110 @@
+# number of slots in each level of the wheel, as a power of 2
+WHEELBITS = 6
+WHEELSIZE = 1 << WHEELBITS
+WHEELMASK = WHEELSIZE - 1
+
+# number of levels, which sets the longest delay the wheel can hold, i.e. 64^4 ticks
+WHEELLEVELS = 4
+
+
+#
+#
+#
+class TimerWheel:
+    """
+    Hierarchical timer wheel, holding at most one pending timer per key.
+
+    Scheduling, re-scheduling, and cancelling a timer are all O(1), regardless of how many timers are
+    pending.  Each call to advance() moves the wheel forward by one tick and only touches the single slot
+    that is due, plus an occasional cascade of one slot from a higher level down into the levels below it.
+
+    The wheel has no notion of real time, it is up to the owner to call advance() once per tick
+    """
+
+    # ctor
+    def __init__(self) -> None:
+        # each slot is a dictionary of {key: (expiry_tick, payload)}
+        self._levels = [[{} for _ in range(WHEELSIZE)] for _ in range(WHEELLEVELS)]
+
+        # the (level, slot) each key is currently stored in, for O(1) cancel
+        self._where = {}
+
+        # current tick
+        self.now = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key, delay_ticks: int, payload=None) -> None:
+        """
+        Schedule a timer to expire delay_ticks from now, replacing any timer already pending for this key
+
+        Args:
+            key: hashable key identifying the timer
+            delay_ticks: number of ticks until expiry, minimum 1
+            payload: anything, returned along with the key when the timer expires
+        """
+        self.cancel(key)
+        expiry = self.now + max(1, delay_ticks)
+        self._insert(key, expiry, payload)
+
+    def cancel(self, key) -> bool:
+        """
+        Args:
+            key: hashable key identifying the timer
+
+        Returns:
+            bool: True if a pending timer was cancelled, False if there was none
+        """
+        where = self._where.pop(key, None)
+        if where:
+            level, slot = where
+            del self._levels[level][slot][key]
+            return True
+        return False
+
+    def advance(self) -> list:
+        """
+        Move the wheel forward by one tick
+
+        Returns:
+            list: (key, payload) tuples for every timer which expired on this tick
+        """
+        self.now += 1
+
+        # cascade any higher level slots which are now due down into the lower levels, highest level first
+        for level in range(WHEELLEVELS - 1, 0, -1):
+            if self.now & ((1 << (WHEELBITS * level)) - 1) == 0:
+                slot = (self.now >> (WHEELBITS * level)) & WHEELMASK
+                entries = self._levels[level][slot]
+                self._levels[level][slot] = {}
+                for key, (expiry, payload) in entries.items():
+                    self._insert(key, expiry, payload)
+
+        # everything in the current level 0 slot has now expired
+        slot = self.now & WHEELMASK
+        entries = self._levels[0][slot]
+        self._levels[0][slot] = {}
+
+        rv = []
+        for key, (expiry, payload) in entries.items():
+            del self._where[key]
+            rv.append((key, payload))
+        return rv
+
+    def _insert(self, key, expiry: int, payload) -> None:
+        """
+        place the timer in the level whose span covers its remaining delay
+        """
+        delta = expiry - self.now
+        level = 0
+        while level < WHEELLEVELS - 1 and delta >= (1 << (WHEELBITS * (level + 1))):
+            level += 1
+
+        # anything beyond the span of the wheel is parked in the furthest slot of the top level, and cascades from there
+        if delta >= (1 << (WHEELBITS * WHEELLEVELS)):
+            expiry = self.now + (1 << (WHEELBITS * WHEELLEVELS)) - 1
+
+        slot = (expiry >> (WHEELBITS * level)) & WHEELMASK
+        self._levels[level][slot][key] = (expiry, payload)
+        self._where[key] = (level, slot)
@@ -0,0 +1,438 @@
+import json
+import math
+import re
+from collections import deque
+
+from util import starprint
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# shortest literal worth using as an Aho-Corasick pre-filter for a regex watch
+MINLITERALLENGTH = 3
+
+# longest stretch of text any watch regex is run against, to put a ceiling on the cost of a slow regex
+MAXREGEXTEXT = 1024
+
+# pending keywords are always allowed to grow to at least this many before being merged into the main automaton
+MINPENDING = 32
+
+
+def required_literal(pattern: str) -> str or None:
+    """
+    Find the longest run of plain characters that every match of a regex must contain,
+    so it can be used as a cheap pre-filter before running the regex itself
+
+    Args:
+        pattern: regular expression text
+
+    Returns:
+        str or None: the literal, or None if the regex has no usable literal
+    """
+    try:
+        items = sre_parse.parse(pattern)
+    except (re.error, TypeError, ValueError):
+        return None
+
+    best = ''
+    run = ''
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            run += chr(av)
+        else:
+            run = ''
+        if len(run) > len(best):
+            best = run
+
+    if len(best) < MINLITERALLENGTH:
+        return None
+    return best
+
+
+def nested_quantifier(pattern: str) -> bool:
+    """
+    Check for a repeat inside another repeat, e.g. (a+)+ or (\\w*\\s)*, the usual cause of catastrophic
+    backtracking, where a long near-miss line can tie up the regex engine for minutes or hours
+
+    Args:
+        pattern: regular expression text
+
+    Returns:
+        bool: True if the regex contains nested quantifiers
+    """
+    try:
+        items = sre_parse.parse(pattern)
+    except (re.error, TypeError, ValueError):
+        return False
+    return _nested_repeat(items, False)
+
+
+def _nested_repeat(items, in_repeat: bool) -> bool:
+    """
+    walk the parsed regex, looking for any repeat of more than one inside another such repeat
+    """
+    for op, av in items:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = av
+            if high > 1 and (in_repeat or _nested_repeat(sub, True)):
+                return True
+            continue
+
+        # groups, alternations, and lookarounds hold their contents as sub-patterns somewhere in their arguments
+        for value in (av if isinstance(av, (tuple, list)) else (av,)):
+            subs = value if isinstance(value, list) else [value]
+            for sub in subs:
+                if isinstance(sub, sre_parse.SubPattern) and _nested_repeat(sub, in_repeat):
+                    return True
+    return False
+
+
+#
+#
+#
+class Watch:
+    """
+    A single user-defined trigger, to be matched against the raw EQ log line of every report
+    """
+
+    # ctor
+    def __init__(self, watch_id: int, pattern: str, is_regex: bool, destination_id: int, is_dm: bool, owner: str, owner_id: int = 0) -> None:
+        """
+        Args:
+            watch_id: unique ID for this watch, used for removal
+            pattern: keyword or regular expression text
+            is_regex: True if pattern is a regular expression, False if it is a plain keyword
+            destination_id: discord channel ID, or discord user ID if is_dm is True
+            is_dm: True if matches should be sent as a direct message to destination_id
+            owner: display name of the discord user who created the watch
+            owner_id: discord user ID of the user who created the watch
+        """
+        self.watch_id = watch_id
+        self.pattern = pattern
+        self.is_regex = is_regex
+        self.destination_id = destination_id
+        self.is_dm = is_dm
+        self.owner = owner
+        self.owner_id = owner_id
+
+        # text to be loaded into the Aho-Corasick automaton, which is the keyword itself, or for a regex,
+        # a literal the regex requires and which is then confirmed by running the compiled regex.
+        # regexes with no such literal are left for the combined alternation regex
+        if is_regex:
+            self.regex = re.compile(pattern, re.IGNORECASE)
+            self.literal = required_literal(pattern)
+        else:
+            self.regex = None
+            self.literal = pattern
+
+    def __str__(self) -> str:
+        kind = 'regex' if self.is_regex else 'keyword'
+        where = 'DM' if self.is_dm else f'<#{self.destination_id}>'
+        return f'[{self.watch_id}] {kind} [{self.pattern}] -> {where} (owner: {self.owner})'
+
+
+#
+#
+#
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for case-insensitive matching of many keywords in a single pass.
+
+    Matching cost is proportional to the length of the text plus the number of hits,
+    independent of how many keywords are loaded into the automaton
+    """
+
+    # ctor
+    def __init__(self, keywords: dict) -> None:
+        """
+        Args:
+            keywords: dictionary of {keyword: set of watch ID's}
+        """
+        # state 0 is the root of the trie
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        # build the trie
+        for keyword, watch_ids in keywords.items():
+            state = 0
+            for ch in keyword.casefold():
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                    self._goto[state][ch] = next_state
+                state = next_state
+            self._output[state] |= watch_ids
+
+        # breadth first walk to set the failure links, and merge the outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> set:
+        """
+        Args:
+            text: text to be searched
+
+        Returns:
+            set: watch ID's for every keyword found anywhere in text
+        """
+        rv = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        state = 0
+        for ch in text.casefold():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                rv |= output[state]
+
+        return rv
+
+
+#
+#
+#
+class WatchList:
+    """
+    Collection of all active watches, compiled into one combined matcher.
+
+    Keywords are loaded into Aho-Corasick automata, along with a required literal from each regular
+    expression, which is only run once its literal is seen.  Regular expressions without a usable
+    literal are joined into a single alternation regex.
+
+    To keep changes cheap, new keywords go into a small pending automaton, which is merged into the
+    main automaton only once it grows past about the square root of the main one.  Removed watches are
+    simply skipped when their ID turns up, until enough of them pile up to be worth a rebuild.
+    All rebuilds are deferred until the next call to match()
+    """
+
+    # ctor
+    def __init__(self) -> None:
+        self._watches = {}
+        self._next_id = 1
+
+        # main keyword automaton, and the number of watch ID's loaded into it, some of which may have been removed since
+        self._main_matcher = None
+        self._main_count = 0
+        self._stale_count = 0
+
+        # pending keywords not yet merged into the main automaton, as {literal: set of watch ID's}
+        self._pending = {}
+        self._pending_count = 0
+        self._pending_matcher = None
+        self._pending_dirty = False
+        self._merge_needed = False
+
+        # regex watches with no usable literal, and the combined alternation regex built from them
+        self._no_literal = []
+        self._regex_matcher = None
+        self._regex_dirty = False
+        self._regex_fallback = False
+
+    def add(self, pattern: str, is_regex: bool, destination_id: int, is_dm: bool, owner: str, owner_id: int = 0) -> Watch:
+        """
+        Create a new watch and add it to the list
+
+        Args:
+            pattern: keyword or regular expression text
+            is_regex: True if pattern is a regular expression, False if it is a plain keyword
+            destination_id: discord channel ID, or discord user ID if is_dm is True
+            is_dm: True if matches should be sent as a direct message to destination_id
+            owner: display name of the discord user who created the watch
+            owner_id: discord user ID of the user who created the watch
+
+        Returns:
+            Watch: the newly created watch
+
+        Raises:
+            re.error: if pattern is not a valid regular expression
+        """
+        # check the regex in the same wrapped form it takes inside the combined matcher, so a bad pattern never
+        # makes it in.  e.g. a global inline flag such as (?i) compiles on its own but not once wrapped.
+        # group names and numbers would clash once all patterns are joined, so those are refused too.
+        # every regex runs on the event loop against every line, so nested quantifiers are refused as well
+        if is_regex:
+            re.compile(f'(?P<w0>{pattern})', re.IGNORECASE)
+            if re.compile(pattern).groupindex or re.search(r'\\[1-9]', pattern):
+                raise re.error('named groups and backreferences are not supported')
+            if nested_quantifier(pattern):
+                raise re.error('nested quantifiers such as (a+)+ are not supported')
+
+        watch = Watch(self._next_id, pattern, is_regex, destination_id, is_dm, owner, owner_id)
+        self._next_id += 1
+        self._watches[watch.watch_id] = watch
+
+        if watch.literal is None:
+            self._regex_dirty = True
+        else:
+            self._pending.setdefault(watch.literal, set()).add(watch.watch_id)
+            self._pending_count += 1
+            self._pending_dirty = True
+            if self._pending_count > max(MINPENDING, math.isqrt(self._main_count)):
+                self._merge_needed = True
+
+        return watch
+
+    def remove(self, watch_id: int) -> Watch or None:
+        """
+        Args:
+            watch_id: ID of the watch to be removed
+
+        Returns:
+            Watch or None: the removed watch, or None if there was no watch with that ID
+        """
+        watch = self._watches.pop(watch_id, None)
+        if watch:
+            if watch.literal is None:
+                self._regex_dirty = True
+            elif watch_id in self._pending.get(watch.literal, ()):
+                self._pending[watch.literal].discard(watch_id)
+                if not self._pending[watch.literal]:
+                    del self._pending[watch.literal]
+                self._pending_count -= 1
+                self._pending_dirty = True
+            else:
+                # leave it in the main automaton, where match() skips it, until enough have piled up
+                self._stale_count += 1
+                if self._stale_count > self._main_count // 2:
+                    self._merge_needed = True
+        return watch
+
+    def save(self, filename: str) -> None:
+        """
+        Save all active watches to a JSON file
+
+        Args:
+            filename: JSON file name
+        """
+        watch_list = [{'watch_id': w.watch_id, 'pattern': w.pattern, 'is_regex': w.is_regex,
+                       'destination_id': w.destination_id, 'is_dm': w.is_dm,
+                       'owner': w.owner, 'owner_id': w.owner_id} for w in self._watches.values()]
+        with open(filename, 'wt') as jsonfile:
+            json.dump(watch_list, jsonfile, indent=4)
+
+    def load(self, filename: str) -> None:
+        """
+        Load watches from a JSON file saved by save(), keeping their ID's.  A missing file is not an error
+
+        Args:
+            filename: JSON file name
+        """
+        try:
+            with open(filename, 'rt') as jsonfile:
+                watch_list = json.load(jsonfile)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as err:
+            starprint(f'Unable to load watches from [{filename}]: {err}')
+            return
+
+        for entry in watch_list:
+            try:
+                self._next_id = entry['watch_id']
+                self.add(entry['pattern'], entry['is_regex'], entry['destination_id'], entry['is_dm'],
+                         entry['owner'], entry.get('owner_id', 0))
+            except (KeyError, TypeError, re.error) as err:
+                starprint(f'Skipping bad watch entry {entry}: {err!r}')
+
+        self._next_id = max(self._watches, default=0) + 1
+
+    def get_watches(self) -> list:
+        """
+        Returns:
+            list: all active watches, in order of creation
+        """
+        return list(self._watches.values())
+
+    def match(self, text: str) -> list:
+        """
+        Args:
+            text: text to be checked against every active watch
+
+        Returns:
+            list: all watches which match text, in order of creation
+        """
+        if not self._watches:
+            return []
+
+        self._rebuild()
+        regex_text = text[:MAXREGEXTEXT]
+
+        candidate_ids = set()
+        if self._main_matcher:
+            candidate_ids |= self._main_matcher.search(text)
+        if self._pending_matcher:
+            candidate_ids |= self._pending_matcher.search(text)
+
+        matched_ids = set()
+        for watch_id in candidate_ids:
+            watch = self._watches.get(watch_id)
+            if watch and (not watch.is_regex or watch.regex.search(regex_text)):
+                matched_ids.add(watch_id)
+
+        # the combined regex acts as a single pass pre-filter, and since hits are rare, only lines
+        # which hit at least one regex pay the cost of checking each of the others individually
+        if self._regex_matcher or self._regex_fallback:
+            m = self._regex_matcher.search(regex_text) if self._regex_matcher else None
+            if m:
+                matched_ids.add(int(m.lastgroup[1:]))
+            if m or self._regex_fallback:
+                for watch in self._no_literal:
+                    if watch.watch_id not in matched_ids and watch.regex.search(regex_text):
+                        matched_ids.add(watch.watch_id)
+
+        return [self._watches[watch_id] for watch_id in sorted(matched_ids)]
+
+    def _rebuild(self) -> None:
+        """
+        rebuild any of the combined matchers which are out of date
+        """
+        if self._merge_needed:
+            self._merge_needed = False
+            keywords = {}
+            for watch in self._watches.values():
+                if watch.literal is not None:
+                    keywords.setdefault(watch.literal, set()).add(watch.watch_id)
+            self._main_matcher = AhoCorasick(keywords) if keywords else None
+            self._main_count = sum(len(watch_ids) for watch_ids in keywords.values())
+            self._stale_count = 0
+
+            self._pending = {}
+            self._pending_count = 0
+            self._pending_matcher = None
+            self._pending_dirty = False
+
+        if self._pending_dirty:
+            self._pending_dirty = False
+            self._pending_matcher = AhoCorasick(self._pending) if self._pending else None
+
+        if self._regex_dirty:
+            self._regex_dirty = False
+            self._regex_fallback = False
+            self._no_literal = [watch for watch in self._watches.values() if watch.literal is None]
+            alternatives = [f'(?P<w{watch.watch_id}>{watch.pattern})' for watch in self._no_literal]
+            self._regex_matcher = None
+            if alternatives:
+                try:
+                    self._regex_matcher = re.compile('|'.join(alternatives), re.IGNORECASE)
+                except re.error as err:
+                    # should never happen since add() checks each pattern, but if it does, check each regex on its own
+                    starprint(f'Unable to build combined watch regex, checking each regex separately: {err}')
+                    self._regex_fallback = True
@@ -0,0 +1,215 @@
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from util import starprint
+
+
+#
+#
+#
+class WebhookState:
+    """
+    Rate limit bookkeeping for one webhook URL, as reported by discord in the response headers
+    """
+
+    # ctor
+    def __init__(self) -> None:
+        # posts to the same webhook are serialized, so the rate limit headers from one post apply to the next
+        self.lock = asyncio.Lock()
+
+        # requests remaining in the current bucket, and monotonic time when the bucket resets
+        self.remaining = 1
+        self.reset_at = 0.0
+
+
+#
+#
+#
+class WebhookSink:
+    """
+    Deliver messages to discord webhook URLs, as an alternative to sending through the gateway bot.
+
+    All posts share a single aiohttp session, so connections to discord are pooled and kept alive
+    across posts.  Rate limits are tracked per webhook, so a busy webhook never holds up the others,
+    and posts which fail with a 429 or a server error are retried with exponential backoff plus jitter
+    """
+
+    # ctor
+    def __init__(self, max_retries: int = 3, connection_limit: int = 20, timeout_seconds: float = 10.0) -> None:
+        """
+        Args:
+            max_retries: number of times to retry a failed post
+            connection_limit: maximum number of simultaneous connections in the pool
+            timeout_seconds: total timeout for each post
+        """
+        self.max_retries = max_retries
+        self.connection_limit = connection_limit
+        self.timeout_seconds = timeout_seconds
+
+        # the session must be created from within the running event loop, so that is deferred until first use
+        self._session = None
+
+        # dictionary of WebhookState, keyed by URL
+        self._states = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns:
+            aiohttp.ClientSession: the shared session, created on first use
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """
+        close the shared session and all pooled connections
+        """
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def send(self, url: str, content: str) -> bool:
+        """
+        Post one message to one webhook, waiting out its rate limit if needed, and retrying on failure
+
+        Args:
+            url: discord webhook URL
+            content: message text
+
+        Returns:
+            bool: True if discord accepted the message
+        """
+        state = self._states.setdefault(url, WebhookState())
+        async with state.lock:
+            for attempt in range(self.max_retries + 1):
+
+                # bucket empty?  then wait for it to reset
+                if state.remaining <= 0:
+                    delay = state.reset_at - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                retry_after = None
+                try:
+                    async with self._get_session().post(url, json={'content': content}) as response:
+                        self._update_state(state, response)
+                        if response.status < 300:
+                            return True
+                        if response.status == 429:
+                            retry_after = float(response.headers.get('Retry-After', 1.0))
+                        elif response.status < 500:
+                            starprint(f'Webhook post failed, status {response.status}: {await response.text()}')
+                            return False
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    starprint(f'Webhook post error: {err!r}')
+
+                # back off before the next attempt, honoring any delay discord asked for
+                if attempt < self.max_retries:
+                    backoff = 0.5 * (2 ** attempt) + random.uniform(0.0, 0.5)
+                    if retry_after is not None:
+                        backoff = retry_after + random.uniform(0.0, 0.5)
+                    await asyncio.sleep(backoff)
+
+        starprint(f'Webhook post abandoned after {self.max_retries + 1} attempts')
+        return False
+
+    async def fan_out(self, urls: list, bufflist: list) -> None:
+        """
+        Post the same list of messages to every webhook in parallel.  Messages to each webhook stay in order
+
+        Args:
+            urls: list of discord webhook URLs
+            bufflist: list of message strings, e.g. from SmartBuffer.get_bufflist()
+        """
+        async def send_all(url: str) -> None:
+            for b in bufflist:
+                await self.send(url, b)
+
+        await asyncio.gather(*[send_all(url) for url in urls])
+
+    @staticmethod
+    def _update_state(state: WebhookState, response: aiohttp.ClientResponse) -> None:
+        """
+        record the rate limit headers from a response
+        """
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset_after = response.headers.get('X-RateLimit-Reset-After')
+        if remaining is not None:
+            state.remaining = int(remaining)
+        if reset_after is not None:
+            state.reset_at = time.monotonic() + float(reset_after)
+        if response.status == 429:
+            state.remaining = 0
+
+
+#
+# check the WebhookSink against a local HTTP stand-in for discord
+#
+async def main():
+    from aiohttp import web
+
+    posts = {}
+    connections = set()
+
+    # each stand-in webhook takes a while to answer, so parallel fan-out is visible in the elapsed time.
+    # 'limited' answers its first post with a 429, and 'broken' answers its first two posts with a 502
+    async def webhook(request):
+        name = request.match_info['name']
+        posts.setdefault(name, []).append((await request.json())['content'])
+        connections.add(request.transport.get_extra_info('peername'))
+
+        if name == 'limited' and len(posts[name]) == 1:
+            return web.json_response({'retry_after': 0.2}, status=429, headers={'Retry-After': '0.2'})
+        if name == 'broken' and len(posts[name]) <= 2:
+            return web.Response(status=502)
+
+        await asyncio.sleep(0.2)
+        return web.Response(status=204, headers={'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset-After': '1'})
+
+    app = web.Application()
+    app.router.add_post('/webhooks/{name}', webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    names = [f'server{n}' for n in range(10)] + ['limited', 'broken']
+    urls = [f'http://127.0.0.1:{port}/webhooks/{name}' for name in names]
+    bufflist = ['first', 'second', 'third']
+
+    sink = WebhookSink()
+    start = time.monotonic()
+    await sink.fan_out(urls, bufflist)
+    elapsed = time.monotonic() - start
+    await sink.close()
+    await runner.cleanup()
+
+    request_count = sum(len(p) for p in posts.values())
+    starprint('WebhookSink check', alignment='^', fill='-')
+    starprint(f'{len(urls)} webhooks x {len(bufflist)} messages, {request_count} requests in {elapsed:.2f} seconds')
+    starprint(f'{len(connections)} connections used')
+
+    # every webhook got every message, in order, with the retried posts repeated
+    for name in names[:10]:
+        assert posts[name] == bufflist, f'{name}: {posts[name]}'
+    assert posts['limited'] == ['first'] + bufflist, f'limited: {posts["limited"]}'
+    assert posts['broken'] == ['first', 'first'] + bufflist, f'broken: {posts["broken"]}'
+
+    # sequential delivery would take at least 12 webhooks x 3 messages x 0.2 seconds
+    assert elapsed < len(urls) * len(bufflist) * 0.2 / 2, f'fan-out not parallel, {elapsed:.2f} seconds'
+
+    # keep-alive connections are reused across posts to the same host
+    assert len(connections) < request_count, f'{len(connections)} connections for {request_count} requests'
+
+    starprint('429 retry, 5xx retry, parallel fan-out, and connection reuse all OK')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
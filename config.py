@@ -100,6 +100,62 @@ def verify_settings() -> None:
         config_data.set(section, 'gmotd', 'gmotd channel id here')
         modified = True
 
+    # watches section
+    section = 'Watches'
+    if not config_data.has_section(section):
+        config_data.add_section(section)
+        modified = True
+
+    if not config_data.has_option(section, 'file_name'):
+        config_data.set(section, 'file_name', 'EQParser-watches.json')
+        modified = True
+
+    # random roll aggregation section
+    section = 'Random Rolls'
+    if not config_data.has_section(section):
+        config_data.add_section(section)
+        modified = True
+
+    if not config_data.has_option(section, 'window_seconds'):
+        config_data.set(section, 'window_seconds', '30')
+        modified = True
+
+    if not config_data.has_option(section, 'top_n'):
+        config_data.set(section, 'top_n', '5')
+        modified = True
+
+    # client liveness section
+    section = 'Client Liveness'
+    if not config_data.has_section(section):
+        config_data.add_section(section)
+        modified = True
+
+    if not config_data.has_option(section, 'silence_seconds'):
+        config_data.set(section, 'silence_seconds', '600')
+        modified = True
+
+    if not config_data.has_option(section, 'coverage_alert'):
+        config_data.set(section, 'coverage_alert', 'False')
+        modified = True
+
+    # mob lifecycle section
+    section = 'Mob Lifecycle'
+    if not config_data.has_section(section):
+        config_data.add_section(section)
+        modified = True
+
+    if not config_data.has_option(section, 'window_minutes'):
+        config_data.set(section, 'window_minutes', '30')
+        modified = True
+
+    # webhooks section, optional entries of the form
+    #       snek_pop = https://discord.com/api/webhooks/id/token https://discord.com/api/webhooks/id2/token2
+    # to deliver that channel's reports to one or more webhooks rather than through the bot
+    section = 'Webhooks'
+    if not config_data.has_section(section):
+        config_data.add_section(section)
+        modified = True
+
     # snek server section
     section = 'Snek Discord Server'
     if not config_data.has_section(section):
@@ -1,5 +1,24 @@
 
+# discord rejects any message over 2000 characters.  Keep the buffers under that, with enough headroom
+# for the closing code fence that is appended whenever a buffer ends inside a ``` block
 MAXBUFFLENGTH = 1950
+CODEFENCE = '```'
+
+
+def discord_len(a_string: str) -> int:
+    """
+    Length of a string the way discord counts it for the message limit, i.e. in UTF-16 code units,
+    so characters outside the basic multilingual plane (most emoji) count as 2
+
+    Args:
+        a_string: string to be measured
+
+    Returns:
+        int: length in UTF-16 code units
+    """
+    if a_string.isascii():
+        return len(a_string)
+    return len(a_string.encode('utf-16-le')) // 2
 
 
 #
@@ -11,9 +30,12 @@ class SmartBuffer:
     There is apparently a limit of 2000 characters on any message, anything over that throws an
     exception
 
-    this class works by just creating a list of buffers, none of which is over the MAXBUFFLENGTH limit
+    this class works by just creating a list of buffers, none of which is over the MAXBUFFLENGTH limit.
+    Strings are collected into a list and joined once per buffer.  A single string too long to fit in
+    any buffer is split, preferably at a line break, else at a space.  If a buffer ends inside a ```
+    code fence, the fence is closed at the end of that buffer and reopened at the start of the next
     Note that when using this, it is important to access the list of buffers using the get_bufflist()
-    method, to ensure any remaining content currently stored in the working_buffer is added to the list
+    method, to ensure any remaining content currently stored in the working buffer is added to the list
     """
 
     # ctor
@@ -21,7 +43,16 @@ class SmartBuffer:
 
         # create a list of strings, each less than MAXBUFFLENGTH in length
         self._bufflist = []
-        self._working_buffer = ''
+
+        # parts of the buffer currently being assembled, and their total length
+        self._parts = []
+        self._length = 0
+
+        # True if the working buffer has any content, beyond a reopened code fence
+        self._has_content = False
+
+        # True if the last buffer ended inside a ``` code fence, which is then reopened in the working buffer
+        self._in_fence = False
 
     def add(self, a_string: str) -> None:
         """
@@ -29,24 +60,135 @@ class SmartBuffer:
 
         :param a_string: str
         """
-        # would the new string make the buffer too long?
-        if (len(self._working_buffer) + len(a_string)) > MAXBUFFLENGTH:
-            self._bufflist.append(self._working_buffer)
-            self._working_buffer = ''
+        if not a_string:
+            return
+
+        # fast path for the usual case, a plain ASCII string that fits in the working buffer
+        if a_string.isascii():
+            length = len(a_string)
+            if self._length + length <= MAXBUFFLENGTH:
+                self._parts.append(a_string)
+                self._length += length
+                self._has_content = True
+                return
+        else:
+            length = discord_len(a_string)
 
-        self._working_buffer += a_string
+        # would the new string make the buffer too long?  start a new buffer, unless the string
+        # is too long to fit in any buffer, in which case it may as well fill out this one first
+        if self._length + length > MAXBUFFLENGTH and length <= MAXBUFFLENGTH and self._has_content:
+            self._flush()
+
+        # still too long, even on its own?  then split it, tracking the start of the remainder rather than slicing
+        start = 0
+        while self._length + length > MAXBUFFLENGTH:
+            cut = self._find_cut(a_string, start, MAXBUFFLENGTH - self._length)
+            if cut == start:
+                self._flush()
+                continue
+            piece = a_string[start:cut]
+            piece_length = discord_len(piece)
+            self._append(piece, piece_length)
+            self._flush()
+            start = cut
+            length -= piece_length
+
+        self._append(a_string[start:] if start else a_string, length)
 
     def get_bufflist(self) -> list:
         """
         :return: list of strings, each less than MAXBUFFLENTH bytes in length
         """
         # add any content currently in the working buffer to the list
-        if self._working_buffer != '':
-            self._bufflist.append(self._working_buffer)
+        if self._has_content:
+            self._flush()
 
         # return the list of buffers
         return self._bufflist
 
+    def _append(self, a_string: str, length: int) -> None:
+        """
+        add a string known to fit to the working buffer
+        """
+        self._parts.append(a_string)
+        self._length += length
+        self._has_content = True
+
+    def _flush(self) -> None:
+        """
+        join the working buffer and move it to the list, closing and then reopening any open code fence.
+
+        Fences are counted once per buffer, in the joined text, so a run of four or more backticks, or a fence
+        spread over two strings, is counted just as it appears in the finished buffer
+        """
+        buff = ''.join(self._parts)
+        self._in_fence = '`' in buff and buff.count(CODEFENCE) % 2 == 1
+
+        # three more backticks always complete exactly one more fence, whatever run of backticks they extend
+        if self._in_fence:
+            buff += CODEFENCE
+        self._bufflist.append(buff)
+
+        self._parts = []
+        self._length = 0
+        self._has_content = False
+        if self._in_fence:
+            self._parts.append(CODEFENCE)
+            self._length = len(CODEFENCE)
+
+    @staticmethod
+    def _find_cut(a_string: str, start: int, room: int) -> int:
+        """
+        find where to split a string, so the piece from start is no longer than room
+
+        Returns:
+            int: index to split at, which is after the last line break or space that fits if there is one,
+            or start if not even the first character fits
+        """
+        # furthest index that fits, counting characters outside the BMP as 2
+        cut = min(start + room, len(a_string))
+        window = a_string[start:cut]
+        if not window.isascii():
+            cut = start
+            used = 0
+            for ch in window:
+                used += 2 if ord(ch) > 0xFFFF else 1
+                if used > room:
+                    break
+                cut += 1
+
+        # back up to a line break, else a space
+        boundary = a_string.rfind('\n', start + 1, cut)
+        if boundary < 0:
+            boundary = a_string.rfind(' ', start + 1, cut)
+        if boundary >= 0:
+            cut = boundary + 1
+        cut = SmartBuffer._skip_fence(a_string, start, cut)
+
+        # a remainder of nothing but a closing fence would turn up as an empty code block of its own,
+        # so leave some of the content to go with it
+        if len(a_string) - cut <= len(CODEFENCE) + 2 and not a_string[cut:].strip('`\n '):
+            boundary = a_string.rfind('\n', start + 1, cut - 1)
+            if boundary < 0:
+                boundary = a_string.rfind(' ', start + 1, cut - 1)
+            cut = boundary + 1 if boundary >= 0 else cut - 1
+            cut = SmartBuffer._skip_fence(a_string, start, cut)
+
+        if cut == start and discord_len(a_string[start]) > room:
+            return start
+        return max(cut, start + 1)
+
+    @staticmethod
+    def _skip_fence(a_string: str, start: int, cut: int) -> int:
+        """
+        back the cut up so it does not split a ``` code fence, but by no more than a fence's length,
+        so a long run of backticks is split rather than backed through one character at a time
+        """
+        floor = max(start + 1, cut - len(CODEFENCE) + 1)
+        while floor < cut < len(a_string) and a_string[cut - 1] == '`' and a_string[cut] == '`':
+            cut -= 1
+        return cut
+
 
 # report width
 REPORT_WIDTH = 100
@@ -64,3 +206,51 @@ def starprint(line: str, alignment: str = '<', fill: str = ' ') -> None:
     """
     width = REPORT_WIDTH
     print(f'** {line.rstrip():{fill}{alignment}{width}} **')
+
+
+#
+# benchmark the SmartBuffer against the original str += implementation, on GMOTD-heavy and plain input
+#
+def main():
+    import timeit
+
+    class SmartBufferV1:
+        def __init__(self):
+            self._bufflist = []
+            self._working_buffer = ''
+
+        def add(self, a_string: str) -> None:
+            if (len(self._working_buffer) + len(a_string)) > MAXBUFFLENGTH:
+                self._bufflist.append(self._working_buffer)
+                self._working_buffer = ''
+            self._working_buffer += a_string
+
+        def get_bufflist(self) -> list:
+            if self._working_buffer != '':
+                self._bufflist.append(self._working_buffer)
+            return self._bufflist
+
+    gmotd = ('[Fri Mar 19 19:16:48 2021] GUILD MOTD: Zalkestna - - What do you call an elf who won\'t share? '
+             '-----Elfish----That\'s your Friday GMOTD!  Have fun and be kind to one another! ')
+    short_parts = [f'GMOTD (from: Azleep) [v]\n```Raw: {gmotd}\nEDT: [Fri Mar 19 15:16:48 2021]```\n'] * 200
+    long_parts = [f'GMOTD (from: Azleep) [v]\n```Raw: {gmotd * 30}\nEDT: [Fri Mar 19 15:16:48 2021]```\n'] * 20
+    plain_parts = ['live   Azleep          eqclient.example.com                         12s ago     345 reports\n'] * 200
+
+    def run(buffer_class, parts):
+        sb = buffer_class()
+        for part in parts:
+            sb.add(part)
+        return sb.get_bufflist()
+
+    starprint('SmartBuffer benchmark', alignment='^', fill='-')
+    for name, parts in [('short GMOTD reports', short_parts), ('oversized GMOTD reports', long_parts), ('plain lines', plain_parts)]:
+        for buffer_class in [SmartBufferV1, SmartBuffer]:
+            seconds = timeit.timeit(lambda: run(buffer_class, parts), number=200) / 200
+            bufflist = run(buffer_class, parts)
+            longest = max(discord_len(b) for b in bufflist)
+            starprint(f'{name:<25}{buffer_class.__name__:<15}{seconds * 1e6:>10.1f} usec  '
+                      f'{len(bufflist):>4} buffers, longest {longest}')
+
+
+if __name__ == '__main__':
+    main()